@@ -2,53 +2,74 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load .env from project root - try multiple locations
-env_locations = [
-    Path(__file__).resolve().parent.parent.parent / ".env",  # app/core/config.py -> .env
-    Path.cwd() / ".env",  # Current working directory
-    Path("c:/workspace/realtime_ai_backend/.env"),  # Absolute path
-]
-
-for env_path in env_locations:
-    if env_path.exists():
-        print(f"Loading .env from: {env_path}")
-        load_dotenv(dotenv_path=env_path, override=False)
-        break
-
-# Fix any BOM-encoded keys by reassigning from os.environ with BOM stripped
-if not os.getenv("OPENAI_API_KEY"):
-    # Check for BOM-prefixed key
-    for key, value in os.environ.items():
-        if 'OPENAI_API_KEY' in key:
-            clean_key = key.lstrip('\ufeff')
-            if clean_key == 'OPENAI_API_KEY':
-                os.environ['OPENAI_API_KEY'] = value
-                break
+# Marker file remembering which .env location won the probe, so later
+# imports skip the exists() ladder entirely
+_env_path_cache = Path(__file__).with_suffix(".envpath")
+
+
+def _load_env():
+    """Load .env, preferring the cached path from a previous run"""
+    try:
+        cached = Path(_env_path_cache.read_text().strip())
+        if cached.is_file():
+            load_dotenv(dotenv_path=cached, override=False)
+            return
+    except OSError:
+        pass
+
+    # Try multiple locations for the project .env
+    env_locations = [
+        Path(__file__).resolve().parent.parent.parent / ".env",  # app/core/config.py -> .env
+        Path.cwd() / ".env",  # Current working directory
+        Path("c:/workspace/realtime_ai_backend/.env"),  # Absolute path
+    ]
+
+    for env_path in env_locations:
+        if env_path.exists():
+            print(f"Loading .env from: {env_path}")
+            load_dotenv(dotenv_path=env_path, override=False)
+            try:
+                _env_path_cache.write_text(str(env_path.resolve()))
+            except OSError:
+                pass  # Read-only install - just re-probe next time
+            break
+
+
+_load_env()
+
+# Snapshot the environment once; all settings read from this dict so the
+# environment is only copied a single time per process.
+_ENV = dict(os.environ)
+
+# Windows editors sometimes leave a BOM prefix on the first .env key -
+# recover OPENAI_API_KEY with two direct lookups instead of scanning
+if "OPENAI_API_KEY" not in _ENV and "\ufeffOPENAI_API_KEY" in _ENV:
+    _ENV["OPENAI_API_KEY"] = _ENV["\ufeffOPENAI_API_KEY"]
 
 class Settings:
     """Application configuration loaded from environment variables"""
-    
+
     # Debug mode
-    DEBUG = os.getenv("DEBUG", "false").lower() == "true"
-    
+    DEBUG = _ENV.get("DEBUG", "false").lower() == "true"
+
     # OpenAI / LLM Configuration
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
-    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
-    LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1500"))
-    LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", "30"))
-    
+    OPENAI_API_KEY = _ENV.get("OPENAI_API_KEY", "")
+    LLM_MODEL = _ENV.get("LLM_MODEL", "gpt-4o-mini")
+    LLM_TEMPERATURE = float(_ENV.get("LLM_TEMPERATURE", "0.7"))
+    LLM_MAX_TOKENS = int(_ENV.get("LLM_MAX_TOKENS", "1500"))
+    LLM_TIMEOUT = int(_ENV.get("LLM_TIMEOUT", "30"))
+
     # Supabase Configuration
-    SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
-    SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
-    
+    SUPABASE_URL = _ENV.get("SUPABASE_URL", "")
+    SUPABASE_KEY = _ENV.get("SUPABASE_KEY", "")
+    SUPABASE_POOL_SIZE = int(_ENV.get("SUPABASE_POOL_SIZE", "10"))
+
     # Session Configuration
-    SESSION_TIMEOUT_SECONDS = int(os.getenv("SESSION_TIMEOUT_SECONDS", "3600"))
-    
+    SESSION_TIMEOUT_SECONDS = int(_ENV.get("SESSION_TIMEOUT_SECONDS", "3600"))
+
     # Server Configuration
-    SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
-    SERVER_PORT = int(os.getenv("SERVER_PORT", "8001"))
+    SERVER_HOST = _ENV.get("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(_ENV.get("SERVER_PORT", "8001"))
     
     def validate(self):
         """Validate critical configuration"""
@@ -1,32 +1,85 @@
-import json
 import logging
+import asyncio
+import time
+import functools
 from typing import List, Dict, Any, AsyncGenerator
 from datetime import datetime
+import httpx
+import orjson
 from openai import AsyncOpenAI
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Single shared HTTP client for all LLM traffic. The SDK default pool
+# throttles badly once many sessions stream concurrently, so raise the
+# connection limits, keep connections alive between requests, and
+# multiplex streams over HTTP/2. Granular timeouts keep a stalled
+# connect from eating the whole read budget; the transport retries
+# once on connection-level failures before the SDK's own retries.
+# Pool limits and http2 live on the transport - httpx ignores the
+# client-level equivalents once an explicit transport is passed.
+_http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=5.0, write=10.0, pool=None),
+    transport=httpx.AsyncHTTPTransport(
+        retries=1,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=256,
+            max_keepalive_connections=128,
+            keepalive_expiry=30
+        )
+    )
+)
+
+
+async def aclose_http_client():
+    """Close the shared LLM HTTP client (called on app shutdown)"""
+    await _http_client.aclose()
+
 
 class LLMService:
     """OpenAI-compatible LLM service with streaming and tool calling"""
-    
+
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=2,
+            http_client=_http_client
+        )
         self.model = settings.LLM_MODEL
         self.temperature = settings.LLM_TEMPERATURE
         self.max_tokens = settings.LLM_MAX_TOKENS
-    
+        # The tools schema never changes - build it once and keep a
+        # pre-serialized form for callers that assemble raw request bodies
+        self._tools = self._build_tools()
+        self._tools_json = orjson.dumps(self._tools)
+
     def get_system_prompt(self) -> str:
-        """Get the system prompt for the AI"""
+        """Get the system prompt for the AI (cached per minute)"""
+        return self._system_prompt_for(int(time.time()) // 60)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _system_prompt_for(minute_bucket: int) -> str:
+        """Build the system prompt for the given minute bucket"""
         current_date = datetime.now().strftime("%B %d, %Y")
         current_time = datetime.now().strftime("%H:%M:%S")
         return f"""You are a helpful, knowledgeable AI assistant. The current date is {current_date} and the current time is {current_time}. You have access to internal tools to help answer questions.
 
 When you need to get user information or system metrics, use the available tools. Be conversational and helpful.
 Always provide clear, concise responses."""
-    
+
     def get_tools(self) -> List[Dict[str, Any]]:
+        """Get the available tools/functions for the LLM"""
+        return self._tools
+
+    def get_tools_json_bytes(self) -> bytes:
+        """Get the tools schema pre-serialized as JSON bytes"""
+        return self._tools_json
+
+    @staticmethod
+    def _build_tools() -> List[Dict[str, Any]]:
         """Define available tools/functions for the LLM"""
         return [
             {
@@ -66,18 +119,41 @@ Always provide clear, concise responses."""
             }
         ]
     
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 200
+    ) -> str:
+        """Get a single non-streaming completion (no tools)"""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=max_tokens,
+            stream=False
+        )
+        return response.choices[0].message.content or ""
+
     async def stream_response(
         self, 
         conversation: List[Dict[str, str]],
         use_tools: bool = True
     ) -> AsyncGenerator[str, None]:
         """Stream LLM response with optional tool calling"""
+
+        # Session histories carry their system prompt at index 0; only
+        # prepend one for bare message lists (e.g. summary generation).
+        # Keeping that prefix byte-identical across turns lets the API's
+        # server-side prompt cache skip re-prefilling it (lower TTFT).
+        # Copy either way since tool handling appends to this list.
+        if conversation and conversation[0].get("role") == "system":
+            messages = list(conversation)
+        else:
+            messages = [
+                {"role": "system", "content": self.get_system_prompt()}
+            ] + conversation
         
-        messages = [
-            {"role": "system", "content": self.get_system_prompt()}
-        ] + conversation
-        
-        tools = self.get_tools() if use_tools else None
+        tools = self._tools if use_tools else None
         
         try:
             # Initial streaming call
@@ -88,21 +164,36 @@ Always provide clear, concise responses."""
                 max_tokens=self.max_tokens,
                 tools=tools,
                 tool_choice="auto" if use_tools else None,
-                stream=True
+                stream=True,
+                # Via extra_body: the pinned SDK (1.12.0) predates the
+                # stream_options keyword but forwards unknown body fields
+                extra_body={"stream_options": {"include_usage": True}}
             )
             
             full_response = ""
-            tool_calls = []
-            
+            tool_calls: Dict[int, Dict[str, str]] = {}
+
             async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    yield content
-                
-                # Collect tool calls if present
-                if chunk.choices[0].delta.tool_calls:
-                    tool_calls.extend(chunk.choices[0].delta.tool_calls)
+                # The final usage frame carries no choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    full_response += delta.content
+                    yield delta.content
+
+                # Tool calls stream as fragments keyed by index, with the
+                # arguments split across many chunks - merge them as they arrive
+                for fragment in delta.tool_calls or ():
+                    call = tool_calls.setdefault(
+                        fragment.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if fragment.id:
+                        call["id"] = fragment.id
+                    if fragment.function.name:
+                        call["name"] = fragment.function.name
+                    if fragment.function.arguments:
+                        call["arguments"] += fragment.function.arguments
             
             # Handle tool calling if needed
             if tool_calls and use_tools:
@@ -115,26 +206,34 @@ Always provide clear, concise responses."""
                     "content": full_response,
                     "tool_calls": [
                         {
-                            "id": tc.id,
+                            "id": call["id"],
                             "type": "function",
                             "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
+                                "name": call["name"],
+                                "arguments": call["arguments"]
                             }
-                        } for tc in tool_calls
+                        } for call in tool_calls.values()
                     ]
                 })
-                
-                # Process each tool call
-                for tool_call in tool_calls:
-                    tool_name = tool_call.function.name
-                    tool_args = json.loads(tool_call.function.arguments)
-                    tool_result = await self._execute_tool(tool_name, tool_args)
-                    
+
+                # Execute all requested tools concurrently - total latency
+                # becomes the slowest tool instead of the sum of all of them
+                calls = list(tool_calls.values())
+                results = await asyncio.gather(
+                    *(
+                        self._execute_tool(call["name"], orjson.loads(call["arguments"]))
+                        for call in calls
+                    ),
+                    return_exceptions=True
+                )
+
+                for call, tool_result in zip(calls, results):
+                    if isinstance(tool_result, Exception):
+                        tool_result = {"error": str(tool_result)}
                     messages.append({
                         "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(tool_result)
+                        "tool_call_id": call["id"],
+                        "content": orjson.dumps(tool_result, default=str).decode()
                     })
                 
                 # Get follow-up response after tool execution
@@ -1,5 +1,6 @@
-import json
 import logging
+import asyncio
+import orjson
 from typing import Dict, Callable, Any
 from fastapi import WebSocket
 
@@ -8,7 +9,9 @@ logger = logging.getLogger(__name__)
 
 class WebSocketManager:
     """Manages active WebSocket connections"""
-    
+
+    __slots__ = ("active_connections",)
+
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
     
@@ -25,35 +28,53 @@ class WebSocketManager:
             logger.info(f"✗ WebSocket disconnected: {session_id}")
     
     async def send_json(self, session_id: str, data: dict):
-        """Send JSON message to a specific session"""
-        if session_id in self.active_connections:
+        """Send JSON message to a specific session (orjson, binary frame)"""
+        websocket = self.active_connections.get(session_id)
+        if websocket is not None:
             try:
-                await self.active_connections[session_id].send_json(data)
+                await websocket.send_bytes(orjson.dumps(data))
             except Exception as e:
                 logger.error(f"Error sending JSON to {session_id}: {e}")
                 await self.disconnect(session_id)
-    
+
+    async def send_bytes(self, session_id: str, payload: bytes):
+        """Send a pre-serialized payload to a specific session"""
+        websocket = self.active_connections.get(session_id)
+        if websocket is not None:
+            try:
+                await websocket.send_bytes(payload)
+            except Exception as e:
+                logger.error(f"Error sending bytes to {session_id}: {e}")
+                await self.disconnect(session_id)
+
     async def send_text(self, session_id: str, text: str):
         """Send text message to a specific session"""
-        if session_id in self.active_connections:
+        websocket = self.active_connections.get(session_id)
+        if websocket is not None:
             try:
-                await self.active_connections[session_id].send_text(text)
+                await websocket.send_text(text)
             except Exception as e:
                 logger.error(f"Error sending text to {session_id}: {e}")
                 await self.disconnect(session_id)
     
     async def broadcast(self, data: dict):
-        """Send message to all connected sessions"""
-        disconnected = []
-        for session_id in self.active_connections:
-            try:
-                await self.active_connections[session_id].send_json(data)
-            except Exception as e:
-                logger.error(f"Error broadcasting to {session_id}: {e}")
-                disconnected.append(session_id)
-        
-        for session_id in disconnected:
-            await self.disconnect(session_id)
+        """Send message to all connected sessions concurrently"""
+        # Serialize once and send the same frame to everyone instead of
+        # re-encoding the payload per connection
+        payload = orjson.dumps(data)
+
+        # Snapshot so connects/disconnects during the sends don't mutate
+        # the dict mid-iteration
+        connections = list(self.active_connections.items())
+        results = await asyncio.gather(
+            *(websocket.send_bytes(payload) for _, websocket in connections),
+            return_exceptions=True
+        )
+
+        for (session_id, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error broadcasting to {session_id}: {result}")
+                await self.disconnect(session_id)
     
     async def handle_message(
         self, 
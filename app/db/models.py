@@ -1,10 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TypedDict
 
 
 class SessionModel(BaseModel):
     """Database model for a session"""
+    model_config = ConfigDict(from_attributes=True, validate_assignment=False)
+
     id: Optional[str] = None
     session_id: str
     user_id: Optional[str] = None
@@ -12,24 +14,20 @@ class SessionModel(BaseModel):
     end_time: Optional[datetime] = None
     duration_seconds: Optional[int] = None
     final_summary: Optional[str] = None
-    
-    class Config:
-        from_attributes = True
 
 
 class EventLogModel(BaseModel):
     """Database model for event logs"""
+    model_config = ConfigDict(from_attributes=True, validate_assignment=False)
+
     id: Optional[str] = None
     session_id: str
     event_type: str  # user_message, ai_response, tool_call, system
     content: str
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
 
 
-class MessageModel(BaseModel):
-    """Model for a message in conversation"""
+class Message(TypedDict):
+    """Shape of a conversation message - plain dicts on the hot path"""
     role: str  # user, assistant, system
     content: str
@@ -1,4 +1,9 @@
 import logging
+import asyncio
+import time
+import concurrent.futures
+from collections import OrderedDict
+import threading
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import uuid
@@ -6,28 +11,70 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# One Supabase client per process, shared across service instances (and
+# event loops) so the underlying HTTP connections are reused instead of
+# paying a TCP/TLS handshake per fresh client
+_client_lock = threading.Lock()
+_shared_client = None
+
+# Formatted timestamp cached for the current second - event logs don't
+# need sub-second precision and a busy server stamps many events per second
+_last_ts = [0, ""]
+
+
+def now_iso() -> str:
+    """UTC ISO timestamp at second resolution, cached per second"""
+    t = int(time.time())
+    if t != _last_ts[0]:
+        _last_ts[0] = t
+        _last_ts[1] = datetime.utcfromtimestamp(t).isoformat()
+    return _last_ts[1]
+
+
+def _get_shared_client(url: str, key: str):
+    """Create the process-wide Supabase client on first use"""
+    global _shared_client
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                from supabase import create_client
+                _shared_client = create_client(url, key)
+    return _shared_client
+
 
 class SupabaseService:
     """Service for Supabase database operations"""
-    
+
     def __init__(self):
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_KEY
         self.client = None
+        # The supabase client is synchronous - run its calls in a thread
+        # pool so they don't block the event loop for the full round-trip
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=settings.SUPABASE_POOL_SIZE
+        )
         self.init_client()
+
+    async def _run(self, fn):
+        """Run a blocking database call in the thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
     
     def init_client(self):
         """Initialize Supabase client if credentials are available"""
         if self.url and self.key:
             try:
-                from supabase import create_client
-                self.client = create_client(self.url, self.key)
+                self.client = _get_shared_client(self.url, self.key)
                 logger.info("✓ Supabase client initialized")
             except Exception as e:
                 logger.warning(f"Could not initialize Supabase: {e}")
                 self.client = None
         else:
             logger.warning("Supabase credentials not configured - using in-memory storage")
+
+    async def aclose(self):
+        """Release pooled resources (called on application shutdown)"""
+        self._executor.shutdown(wait=False)
     
     async def health_check(self) -> bool:
         """Check if Supabase connection is healthy"""
@@ -35,7 +82,9 @@ class SupabaseService:
             return False
         
         try:
-            result = self.client.table("sessions").select("*").limit(1).execute()
+            await self._run(
+                lambda: self.client.table("sessions").select("*").limit(1).execute()
+            )
             return True
         except Exception as e:
             logger.error(f"Health check failed: {e}")
@@ -59,7 +108,9 @@ class SupabaseService:
                 "duration_seconds": None,
                 "final_summary": None
             }
-            result = self.client.table("sessions").insert(data).execute()
+            result = await self._run(
+                lambda: self.client.table("sessions").insert(data).execute()
+            )
             logger.info(f"✓ Session created: {session_id}")
             return result.data[0] if result.data else data
         except Exception as e:
@@ -72,9 +123,11 @@ class SupabaseService:
             return self._get_session_memory(session_id)
         
         try:
-            result = self.client.table("sessions").select("*").eq(
-                "session_id", session_id
-            ).execute()
+            result = await self._run(
+                lambda: self.client.table("sessions").select("*").eq(
+                    "session_id", session_id
+                ).execute()
+            )
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error getting session: {e}")
@@ -102,9 +155,11 @@ class SupabaseService:
             if final_summary:
                 data["final_summary"] = final_summary
             
-            result = self.client.table("sessions").update(data).eq(
-                "session_id", session_id
-            ).execute()
+            result = await self._run(
+                lambda: self.client.table("sessions").update(data).eq(
+                    "session_id", session_id
+                ).execute()
+            )
             logger.info(f"✓ Session updated: {session_id}")
             return result.data[0] if result.data else {}
         except Exception as e:
@@ -128,31 +183,60 @@ class SupabaseService:
                 "session_id": session_id,
                 "event_type": event_type,
                 "content": content,
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": now_iso()
             }
-            result = self.client.table("event_logs").insert(data).execute()
+            result = await self._run(
+                lambda: self.client.table("event_logs").insert(data).execute()
+            )
             return result.data[0] if result.data else data
         except Exception as e:
             logger.error(f"Error logging event: {e}")
             return self._log_event_memory(session_id, event_type, content)
     
+    async def log_events_bulk(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of events into event_logs in a single request"""
+        if not events:
+            return []
+
+        if not self.client:
+            return self._log_events_bulk_memory(events)
+
+        try:
+            result = await self._run(
+                lambda: self.client.table("event_logs").insert(events).execute()
+            )
+            return result.data if result.data else events
+        except Exception as e:
+            logger.error(f"Error logging event batch: {e}")
+            return self._log_events_bulk_memory(events)
+
     async def get_session_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all events for a session"""
         if not self.client:
             return self._get_session_history_memory(session_id)
         
         try:
-            result = self.client.table("event_logs").select("*").eq(
-                "session_id", session_id
-            ).order("created_at", desc=False).execute()
+            result = await self._run(
+                lambda: self.client.table("event_logs").select("*").eq(
+                    "session_id", session_id
+                ).order("created_at", desc=False).execute()
+            )
             return result.data if result.data else []
         except Exception as e:
             logger.error(f"Error getting session history: {e}")
             return self._get_session_history_memory(session_id)
     
-    # In-memory fallbacks for when Supabase is not configured
-    _memory_sessions: Dict[str, Dict] = {}
-    _memory_events: Dict[str, List[Dict]] = {}
+    # In-memory fallbacks for when Supabase is not configured, bounded so
+    # a long-lived process without credentials can't grow without limit
+    _MEMORY_MAX_SESSIONS = 1000
+    _memory_sessions: "OrderedDict[str, Dict]" = OrderedDict()
+    _memory_events: "OrderedDict[str, List[Dict]]" = OrderedDict()
+
+    def _trim_memory(self):
+        while len(self._memory_sessions) > self._MEMORY_MAX_SESSIONS:
+            self._memory_sessions.popitem(last=False)
+        while len(self._memory_events) > self._MEMORY_MAX_SESSIONS:
+            self._memory_events.popitem(last=False)
     
     def _create_session_memory(self, session_id: str, user_id: Optional[str] = None) -> Dict:
         self._memory_sessions[session_id] = {
@@ -165,6 +249,7 @@ class SupabaseService:
             "final_summary": None
         }
         self._memory_events[session_id] = []
+        self._trim_memory()
         return self._memory_sessions[session_id]
     
     def _get_session_memory(self, session_id: str) -> Optional[Dict]:
@@ -188,13 +273,26 @@ class SupabaseService:
             "session_id": session_id,
             "event_type": event_type,
             "content": content,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": now_iso()
         }
         if session_id not in self._memory_events:
             self._memory_events[session_id] = []
+            self._trim_memory()
         self._memory_events[session_id].append(event)
         return event
     
+    def _log_events_bulk_memory(self, events: List[Dict]) -> List[Dict]:
+        stored = []
+        for event in events:
+            event = {"id": str(uuid.uuid4()), **event}
+            session_id = event["session_id"]
+            if session_id not in self._memory_events:
+                self._memory_events[session_id] = []
+                self._trim_memory()
+            self._memory_events[session_id].append(event)
+            stored.append(event)
+        return stored
+
     def _get_session_history_memory(self, session_id: str) -> List[Dict]:
         return self._memory_events.get(session_id, [])
 
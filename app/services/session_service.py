@@ -1,15 +1,73 @@
 import logging
+import asyncio
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
-from app.db.supabase import supabase_service
+from app.db.supabase import supabase_service, now_iso
+from app.core.llm import llm_service
 
 logger = logging.getLogger(__name__)
 
+# Event batching tuning: flush whenever this many events are queued,
+# or after this many seconds, whichever comes first
+BATCH_MAX_EVENTS = 64
+BATCH_FLUSH_SECONDS = 0.05
+
+# Cap on concurrently tracked sessions - the least recently used session
+# is summarized and evicted past this point so memory stays bounded
+MAX_ACTIVE_SESSIONS = 1000
+
+# Role -> event_type mapping for persisted events
+_EVENT_TYPES = {"user": "user_message", "assistant": "ai_response"}
+
 
 class SessionService:
     """Service for managing session state and conversation history"""
-    
+
     def __init__(self):
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
+        self.conversations: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self._start_times: Dict[str, float] = {}
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _ensure_flush_worker(self):
+        """Lazily start the background event flusher on the running loop"""
+        if self._event_queue is None:
+            self._event_queue = asyncio.Queue()
+            self._flush_task = asyncio.create_task(self._flush_events_loop())
+
+    async def _flush_events_loop(self):
+        """Drain queued events and persist them in batches"""
+        while True:
+            # Block until at least one event is available
+            batch = [await self._event_queue.get()]
+
+            # Collect more events within the flush window, up to the batch cap
+            while len(batch) < BATCH_MAX_EVENTS:
+                try:
+                    event = await asyncio.wait_for(
+                        self._event_queue.get(), timeout=BATCH_FLUSH_SECONDS
+                    )
+                    batch.append(event)
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await supabase_service.log_events_bulk(batch)
+            except Exception as e:
+                logger.error(f"Error flushing event batch: {e}")
+
+    async def flush_pending_events(self):
+        """Flush any events still queued (used on session close / shutdown)"""
+        if self._event_queue is None:
+            return
+
+        batch = []
+        while not self._event_queue.empty():
+            batch.append(self._event_queue.get_nowait())
+
+        if batch:
+            await supabase_service.log_events_bulk(batch)
     
     async def create_session(
         self,
@@ -18,8 +76,14 @@ class SessionService:
     ):
         """Initialize a new session"""
         if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
+            # Seed the history with the system prompt so every turn can
+            # reuse the same list instead of re-concatenating it
+            self.conversations[session_id] = [
+                {"role": "system", "content": llm_service.get_system_prompt()}
+            ]
+            self._start_times[session_id] = time.monotonic()
+            self._evict_idle_sessions()
+
         # Create session in database
         await supabase_service.create_session(session_id, user_id)
         logger.info(f"✓ Session created: {session_id}")
@@ -31,30 +95,63 @@ class SessionService:
         content: str
     ):
         """Add a message to the conversation and persist to database"""
-        
-        # Initialize if needed
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
-        # Add to in-memory conversation
-        self.conversations[session_id].append({
+
+        # Single lookup with inline initialization for new sessions
+        conversation = self.conversations.get(session_id)
+        if conversation is None:
+            conversation = self.conversations[session_id] = []
+            self._evict_idle_sessions()
+        else:
+            self.conversations.move_to_end(session_id)
+
+        conversation.append({
             "role": role,
             "content": content
         })
-        
-        # Persist to database
-        event_type = "user_message" if role == "user" else "ai_response"
-        await supabase_service.log_event(
-            session_id=session_id,
-            event_type=event_type,
-            content=content
-        )
-        
-        logger.debug(f"Message added to {session_id}: {role}")
+
+        # Enqueue for batched persistence (non-blocking on the hot path)
+        self._ensure_flush_worker()
+        self._event_queue.put_nowait({
+            "session_id": session_id,
+            "event_type": _EVENT_TYPES.get(role, "ai_response"),
+            "content": content,
+            "created_at": now_iso()
+        })
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Message added to {session_id}: {role}")
     
+    def _evict_idle_sessions(self):
+        """Evict least recently used sessions past MAX_ACTIVE_SESSIONS"""
+        while len(self.conversations) > MAX_ACTIVE_SESSIONS:
+            session_id, conversation = self.conversations.popitem(last=False)
+            self._start_times.pop(session_id, None)
+            logger.info(f"Evicting idle session: {session_id}")
+
+            # Imported lazily - summary_service imports this module
+            from app.services.summary_service import _pending_tasks, summary_service
+            task = asyncio.create_task(
+                summary_service.generate_and_save_summary(session_id, conversation)
+            )
+            _pending_tasks.add(task)
+            task.add_done_callback(_pending_tasks.discard)
+
     def get_conversation(self, session_id: str) -> List[Dict[str, str]]:
         """Get the current conversation for a session"""
-        return self.conversations.get(session_id, [])
+        conversation = self.conversations.get(session_id)
+        if conversation is None:
+            return []
+        # Reads count as activity too, so a session that is prompting the
+        # LLM every turn isn't the next LRU eviction candidate
+        self.conversations.move_to_end(session_id)
+        return conversation
+
+    def get_session_duration(self, session_id: str) -> Optional[int]:
+        """Get seconds since the session was created, if known locally"""
+        start = self._start_times.get(session_id)
+        if start is None:
+            return None
+        return int(time.monotonic() - start)
     
     async def get_full_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get the full conversation history from database"""
@@ -76,10 +173,14 @@ class SessionService:
     async def close_session(self, session_id: str) -> str:
         """Close a session and return summary text for persistence"""
         conversation = self.get_conversation(session_id)
-        
+
+        # Make sure any queued events for this session reach the database
+        await self.flush_pending_events()
+
         # Clean up in-memory storage
         if session_id in self.conversations:
             del self.conversations[session_id]
+        self._start_times.pop(session_id, None)
         
         logger.info(f"✓ Session closed: {session_id}")
         return f"Session {session_id} closed with {len(conversation)} messages"
@@ -3,10 +3,15 @@ import asyncio
 from typing import List, Dict, Any
 from app.db.supabase import supabase_service
 from app.core.llm import llm_service
+from app.services.session_service import session_service
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Strong references to in-flight summary tasks - asyncio only keeps a
+# weak ref to tasks, so without this a pending summary can be GC'd
+_pending_tasks: set = set()
+
 
 class SummaryService:
     """Service for generating session summaries after disconnection"""
@@ -18,20 +23,23 @@ class SummaryService:
     ):
         """Generate a summary for the session and save to database"""
         
-        if not conversation or len(conversation) == 0:
+        # Histories start with the system prompt - only summarize sessions
+        # that actually exchanged messages
+        if not any(msg["role"] != "system" for msg in conversation):
             logger.info(f"No conversation history for {session_id}, skipping summary")
             return
         
         try:
             summary = await self._generate_summary(conversation)
-            
-            # Calculate duration (in seconds)
-            session = await supabase_service.get_session(session_id)
-            if session and session.get("start_time"):
-                start_time = datetime.fromisoformat(session["start_time"])
-                duration = int((datetime.utcnow() - start_time).total_seconds())
-            else:
-                duration = None
+
+            # Duration is tracked locally by SessionService, so the extra
+            # get_session round-trip is only needed for unknown sessions
+            duration = session_service.get_session_duration(session_id)
+            if duration is None:
+                session = await supabase_service.get_session(session_id)
+                if session and session.get("start_time"):
+                    start_time = datetime.fromisoformat(session["start_time"])
+                    duration = int((datetime.utcnow() - start_time).total_seconds())
             
             # Update session with summary
             await supabase_service.update_session(
@@ -54,9 +62,11 @@ class SummaryService:
         """Generate and save summary as a background task (non-blocking)"""
         
         # Run as a background task without blocking the disconnect
-        asyncio.create_task(
+        task = asyncio.create_task(
             self.generate_and_save_summary(session_id, conversation)
         )
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
     
     async def _generate_summary(self, conversation: List[Dict[str, str]]) -> str:
         """Generate a concise summary of the conversation"""
@@ -64,11 +74,20 @@ class SummaryService:
         if len(conversation) == 0:
             return "Empty session - no conversation occurred."
         
-        # Build a context for summary generation
-        conversation_text = "\n".join([
-            f"{msg['role'].upper()}: {msg['content'][:200]}"
-            for msg in conversation[-10:]  # Use last 10 messages
-        ])
+        # Build a context for summary generation from the last 10 messages,
+        # without materializing an intermediate list or copying the tail
+        def format_message(msg: Dict[str, str]) -> str:
+            content = msg["content"]
+            if len(content) > 200:
+                content = content[:200]
+            return f"{msg['role'].upper()}: {content}"
+
+        start = max(0, len(conversation) - 10)
+        conversation_text = "\n".join(
+            format_message(conversation[i])
+            for i in range(start, len(conversation))
+            if conversation[i]["role"] != "system"
+        )
         
         prompt = f"""Provide a brief (2-3 sentences) summary of this conversation:
 
@@ -77,15 +96,13 @@ class SummaryService:
 Summary:"""
         
         try:
-            summary = ""
-            async for token in llm_service.stream_response(
-                [{"role": "user", "content": prompt}],
-                use_tools=False
-            ):
-                summary += token
-            
+            # A short summary doesn't benefit from streaming - one
+            # non-streaming call avoids the per-chunk SSE overhead
+            summary = await llm_service.complete(
+                [{"role": "user", "content": prompt}]
+            )
             return summary.strip()
-        
+
         except Exception as e:
             logger.error(f"Error in _generate_summary: {e}")
             return f"Summary generation failed: {str(e)}"
@@ -1,58 +1,75 @@
 import logging
 import json
+import functools
+from datetime import datetime, timezone
+from types import MappingProxyType
 from typing import Dict, Any
 
+# Imported once at module load instead of on every metrics call
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 logger = logging.getLogger(__name__)
 
+# Simulated user profiles - immutable and shared across all calls
+_PROFILES = MappingProxyType({
+    "user1": {
+        "name": "Alice Johnson",
+        "email": "alice@example.com",
+        "account_status": "active",
+        "subscription_tier": "premium",
+        "created_at": "2023-06-15"
+    },
+    "user2": {
+        "name": "Bob Smith",
+        "email": "bob@example.com",
+        "account_status": "active",
+        "subscription_tier": "free",
+        "created_at": "2024-01-20"
+    }
+})
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_fallback_profile(user_id: str) -> Dict[str, Any]:
+    """Build (and cache) the placeholder profile for unknown users"""
+    return {
+        "name": "User " + user_id[:8],
+        "email": f"{user_id}@example.com",
+        "account_status": "pending",
+        "subscription_tier": "free",
+        "created_at": "2024-01-01"
+    }
+
 
 class ToolsService:
     """Service for executing tools that LLM can call"""
-    
+
+    def __init__(self):
+        # O(1) dispatch instead of an if/elif chain
+        self._tools = {
+            "fetch_user_profile": self._fetch_user_profile,
+            "get_system_metrics": self._get_system_metrics,
+        }
+
     async def execute_tool(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool and return the result"""
-        logger.info(f"Executing tool: {tool_name}")
-        
-        if tool_name == "fetch_user_profile":
-            return await self._fetch_user_profile(args)
-        elif tool_name == "get_system_metrics":
-            return await self._get_system_metrics(args)
-        else:
+        logger.info("Executing tool: %s", tool_name)
+
+        tool = self._tools.get(tool_name)
+        if tool is None:
             return {"error": f"Unknown tool: {tool_name}"}
-    
+        return await tool(args)
+
     async def _fetch_user_profile(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Fetch user profile (simulated)"""
         user_id = args.get("user_id", "unknown")
-        
-        # Simulated user profiles
-        profiles = {
-            "user1": {
-                "name": "Alice Johnson",
-                "email": "alice@example.com",
-                "account_status": "active",
-                "subscription_tier": "premium",
-                "created_at": "2023-06-15"
-            },
-            "user2": {
-                "name": "Bob Smith",
-                "email": "bob@example.com",
-                "account_status": "active",
-                "subscription_tier": "free",
-                "created_at": "2024-01-20"
-            }
-        }
-        
-        if user_id in profiles:
-            profile = profiles[user_id]
-        else:
-            profile = {
-                "name": "User " + user_id[:8],
-                "email": f"{user_id}@example.com",
-                "account_status": "pending",
-                "subscription_tier": "free",
-                "created_at": "2024-01-01"
-            }
-        
-        logger.info(f"✓ User profile fetched: {profile.get('name')}")
+
+        profile = _PROFILES.get(user_id) or _build_fallback_profile(user_id)
+
+        logger.info("✓ User profile fetched: %s", profile.get("name"))
         return {
             "user_id": user_id,
             **profile
@@ -60,21 +77,20 @@ class ToolsService:
     
     async def _get_system_metrics(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get system metrics (simulated)"""
-        import psutil
-        import os
-        
         metric_type = args.get("metric_type", "all")
-        
+
         try:
-            # Get real metrics if psutil is available
-            cpu = psutil.cpu_percent(interval=0.1)
+            # Get real metrics if psutil is available (AttributeError on
+            # the None fallback lands in the except). interval=None returns
+            # the usage since the last call without the blocking 100ms sleep
+            cpu = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
-            
+
             metrics = {
                 "cpu_usage_percent": cpu,
                 "memory_usage_percent": memory.percent,
                 "memory_available_gb": memory.available / (1024 ** 3),
-                "timestamp": os.popen("date").read().strip()
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds")
             }
         except:
             # Fallback simulated metrics
@@ -93,7 +109,7 @@ class ToolsService:
                 "memory_available_gb": metrics["memory_available_gb"]
             }
         
-        logger.info(f"✓ System metrics retrieved")
+        logger.info("✓ System metrics retrieved")
         return metrics
 
 
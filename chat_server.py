@@ -1,68 +1,141 @@
 ﻿import os
-import uuid
-import json
+import sys
+import secrets
 import asyncio
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import HTMLResponse
-from openai import AsyncOpenAI
+import gzip
+import orjson
+import aiohttp
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import Response
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv("C:\\workspace\\realtime_ai_backend\\.env")
 
-app = FastAPI()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-sessions = {}
+OPENAI_API_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
+
+# Streaming goes straight to the completions endpoint over aiohttp and
+# parses the SSE lines with orjson, skipping the SDK's pydantic models
+aio_session = None
+
+
+def _get_aio_session():
+    global aio_session
+    if aio_session is None or aio_session.closed:
+        aio_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=256, limit_per_host=256, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=120, sock_connect=5),
+            headers={
+                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}",
+                "Content-Type": "application/json",
+            },
+        )
+    return aio_session
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if aio_session is not None and not aio_session.closed:
+        await aio_session.close()
+
+app = FastAPI(lifespan=lifespan)
+# Bounded store: idle sessions expire after an hour and the oldest are
+# evicted past MAX_SESSIONS, so memory can't grow without limit
+sessions = TTLCache(maxsize=int(os.getenv("MAX_SESSIONS", "10000")), ttl=3600)
+
+# Binary framing: 1 tag byte + raw UTF-8 payload for chunks
+FRAME_START = b"\x01"
+FRAME_CHUNK = b"\x02"
+FRAME_END = b"\x03"
 MODEL = os.getenv("LLM_MODEL", "gpt-4")
+SYSTEM_MSG = {"role": "system", "content": "You are helpful."}
 
-HTML = """<!DOCTYPE html><html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width"><title>Chat</title><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:system-ui;background:linear-gradient(135deg,#667eea,#764ba2);min-height:100vh;display:flex;align-items:center;justify-content:center}.container{width:100%;max-width:700px;height:85vh;background:white;border-radius:15px;box-shadow:0 20px 60px rgba(0,0,0,.3);display:flex;flex-direction:column}.header{background:linear-gradient(135deg,#667eea,#764ba2);color:white;padding:20px;text-align:center}.header h1{font-size:24px;margin:0}.chat-box{flex:1;overflow-y:auto;padding:20px;background:#f8f9fa;display:flex;flex-direction:column;gap:12px}.message{display:flex}.message.user{justify-content:flex-end}.message.ai{justify-content:flex-start}.bubble{max-width:75%;padding:12px 16px;border-radius:15px;word-wrap:break-word;font-size:14px}.message.user .bubble{background:linear-gradient(135deg,#667eea,#764ba2);color:white}.message.ai .bubble{background:#e9ecef;color:#333}.input-area{padding:16px 20px;border-top:1px solid #ddd;display:flex;gap:10px}#messageInput{flex:1;padding:12px 15px;border:1px solid #ddd;border-radius:25px;font-size:14px;font-family:inherit}#messageInput:focus{outline:0;border-color:#667eea}#sendBtn{padding:12px 25px;background:linear-gradient(135deg,#667eea,#764ba2);color:white;border:0;border-radius:25px;cursor:pointer;font-weight:600;font-size:14px}#sendBtn:disabled{opacity:.6}</style></head><body><div class="container"><div class="header"><h1>AI Chat</h1></div><div id="chatBox" class="chat-box"></div><div class="input-area"><input type="text" id="messageInput" placeholder="Type message..." autocomplete="off"><button id="sendBtn">Send</button></div></div><script>let ws,waiting=false;const chat=document.getElementById('chatBox'),input=document.getElementById('messageInput'),btn=document.getElementById('sendBtn');function connect(){const proto=location.protocol==='https:'?'wss:':'ws:',url=proto+'//'+location.host+'/ws/new';ws=new WebSocket(url);ws.onopen=()=>{console.log('Connected');msg('Ready!',false)};ws.onmessage=e=>{const d=JSON.parse(e.data);if(d.type==='start'){const div=document.createElement('div');div.className='message ai';const b=document.createElement('div');b.className='bubble';b.id='aiMsg';b.textContent='';div.appendChild(b);chat.appendChild(div)}else if(d.type==='chunk'){const ai=document.getElementById('aiMsg');if(ai)ai.textContent+=d.text}else if(d.type==='end'){waiting=false;btn.disabled=false}};ws.onerror=()=>msg('Error',false);ws.onclose=()=>setTimeout(connect,3000)}function msg(text,isUser){const div=document.createElement('div');div.className='message '+(isUser?'user':'ai');const b=document.createElement('div');b.className='bubble';b.textContent=text;div.appendChild(b);chat.appendChild(div);chat.scrollTop=chat.scrollHeight}function send(){const text=input.value.trim();if(!text||waiting)return;msg(text,true);input.value='';waiting=true;btn.disabled=true;ws.send(JSON.stringify({text}))}input.addEventListener('keypress',e=>{e.key==='Enter'&&send()});btn.onclick=send;connect()</script></body></html>"""
+HTML = """<!DOCTYPE html><html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width"><title>Chat</title><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:system-ui;background:linear-gradient(135deg,#667eea,#764ba2);min-height:100vh;display:flex;align-items:center;justify-content:center}.container{width:100%;max-width:700px;height:85vh;background:white;border-radius:15px;box-shadow:0 20px 60px rgba(0,0,0,.3);display:flex;flex-direction:column}.header{background:linear-gradient(135deg,#667eea,#764ba2);color:white;padding:20px;text-align:center}.header h1{font-size:24px;margin:0}.chat-box{flex:1;overflow-y:auto;padding:20px;background:#f8f9fa;display:flex;flex-direction:column;gap:12px}.message{display:flex}.message.user{justify-content:flex-end}.message.ai{justify-content:flex-start}.bubble{max-width:75%;padding:12px 16px;border-radius:15px;word-wrap:break-word;font-size:14px}.message.user .bubble{background:linear-gradient(135deg,#667eea,#764ba2);color:white}.message.ai .bubble{background:#e9ecef;color:#333}.input-area{padding:16px 20px;border-top:1px solid #ddd;display:flex;gap:10px}#messageInput{flex:1;padding:12px 15px;border:1px solid #ddd;border-radius:25px;font-size:14px;font-family:inherit}#messageInput:focus{outline:0;border-color:#667eea}#sendBtn{padding:12px 25px;background:linear-gradient(135deg,#667eea,#764ba2);color:white;border:0;border-radius:25px;cursor:pointer;font-weight:600;font-size:14px}#sendBtn:disabled{opacity:.6}</style></head><body><div class="container"><div class="header"><h1>AI Chat</h1></div><div id="chatBox" class="chat-box"></div><div class="input-area"><input type="text" id="messageInput" placeholder="Type message..." autocomplete="off"><button id="sendBtn">Send</button></div></div><script>let ws,waiting=false;const dec=new TextDecoder();const chat=document.getElementById('chatBox'),input=document.getElementById('messageInput'),btn=document.getElementById('sendBtn');function connect(){const proto=location.protocol==='https:'?'wss:':'ws:',url=proto+'//'+location.host+'/ws/new';ws=new WebSocket(url);ws.binaryType='arraybuffer';ws.onopen=()=>{console.log('Connected');msg('Ready!',false)};ws.onmessage=e=>{if(e.data instanceof ArrayBuffer){const b=new Uint8Array(e.data);if(b[0]===1)handleMsg({type:'start'});else if(b[0]===2)handleMsg({type:'chunk',text:dec.decode(b.subarray(1))});else if(b[0]===3)handleMsg({type:'end'})}else{handleMsg(JSON.parse(e.data))}};ws.onerror=()=>msg('Error',false);ws.onclose=()=>setTimeout(connect,3000)}function handleMsg(d){if(d.type==='start'){const div=document.createElement('div');div.className='message ai';const b=document.createElement('div');b.className='bubble';b.id='aiMsg';b.textContent='';div.appendChild(b);chat.appendChild(div)}else if(d.type==='chunk'){const ai=document.getElementById('aiMsg');if(ai)ai.textContent+=d.text}else if(d.type==='end'){waiting=false;btn.disabled=false}}function msg(text,isUser){const div=document.createElement('div');div.className='message '+(isUser?'user':'ai');const b=document.createElement('div');b.className='bubble';b.textContent=text;div.appendChild(b);chat.appendChild(div);chat.scrollTop=chat.scrollHeight}function send(){const text=input.value.trim();if(!text||waiting)return;msg(text,true);input.value='';waiting=true;btn.disabled=true;ws.send(JSON.stringify({text}))}input.addEventListener('keypress',e=>{e.key==='Enter'&&send()});btn.onclick=send;connect()</script></body></html>"""
+
+# Pre-encoded / pre-gzipped page bytes, built once at import
+HTML_BYTES = HTML.encode("utf-8")
+HTML_GZIP = gzip.compress(HTML_BYTES, compresslevel=9)
 
 @app.get("/")
-async def root():
-    return HTMLResponse(HTML)
+async def root(request: Request):
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            HTML_GZIP,
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return Response(HTML_BYTES, media_type="text/html")
 
 @app.websocket("/ws/new")
 async def ws_endpoint(websocket: WebSocket):
-    sid = str(uuid.uuid4())
+    sid = secrets.token_urlsafe(12)
     await websocket.accept()
-    sessions[sid] = []
+    sessions[sid] = [SYSTEM_MSG]
     
     try:
         while True:
             data = await websocket.receive_text()
-            msg = json.loads(data).get("text", "").strip()
+            msg = orjson.loads(data).get("text", "").strip()
             
             if not msg:
                 continue
             
             sessions[sid].append({"role": "user", "content": msg})
-            await websocket.send_json({"type": "start"})
-            
-            response = await client.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "system", "content": "You are helpful."}] + sessions[sid],
-                stream=True,
-                max_tokens=2000
-            )
+            await websocket.send_bytes(FRAME_START)
             
+            payload = orjson.dumps({
+                "model": MODEL,
+                "messages": sessions[sid],
+                "stream": True,
+                "stream_options": {"include_usage": True},
+                "max_tokens": 2000
+            })
+
+            # Batch tokens into frames of up to 256 chars / 25ms so each
+            # WebSocket frame carries many deltas instead of one
             full = ""
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    full += token
-                    await websocket.send_json({"type": "chunk", "text": token})
-                    await asyncio.sleep(0)
-            
+            buf = ""
+            now = asyncio.get_running_loop().time
+            last_flush = now()
+            async with _get_aio_session().post(OPENAI_API_URL, data=payload) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[6:].strip()
+                    if data == b"[DONE]":
+                        break
+                    choices = orjson.loads(data)["choices"]
+                    token = choices[0]["delta"].get("content") if choices else None
+                    if token:
+                        full += token
+                        buf += token
+                        if len(buf) >= 256 or now() - last_flush >= 0.025:
+                            await websocket.send_bytes(FRAME_CHUNK + buf.encode())
+                            buf = ""
+                            last_flush = now()
+
+            if buf:
+                await websocket.send_bytes(FRAME_CHUNK + buf.encode())
+
             sessions[sid].append({"role": "assistant", "content": full})
-            await websocket.send_json({"type": "end"})
+            # Keep the history short: system prompt + the last 30 messages
+            if len(sessions[sid]) > 40:
+                del sessions[sid][1:len(sessions[sid]) - 30]
+            await websocket.send_bytes(FRAME_END)
             
     except Exception as e:
         print(f"Error: {e}")
-        if sid in sessions:
-            del sessions[sid]
+    finally:
+        sessions.pop(sid, None)
 
 if __name__ == "__main__":
     import uvicorn
     print("\n" + "="*50)
     print("AI Chat Server - http://localhost:8000")
     print("="*50 + "\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets")
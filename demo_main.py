@@ -1,11 +1,10 @@
-﻿from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+﻿import gzip
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 
 app = FastAPI(title="Realtime AI Backend - Demo", version="1.0.0")
 
-@app.get("/")
-async def root():
-    html = """<!DOCTYPE html>
+ROOT_HTML = """<!DOCTYPE html>
 <html>
 <head>
     <title>Realtime AI Backend</title>
@@ -47,12 +46,28 @@ requirements.txt (Dependencies)
     </ol>
 </body>
 </html>"""
-    return HTMLResponse(content=html)
+
+# Static page - encode and gzip once instead of on every request
+ROOT_HTML_BYTES = ROOT_HTML.encode("utf-8")
+ROOT_HTML_GZIP = gzip.compress(ROOT_HTML_BYTES, compresslevel=9)
+
+@app.get("/")
+async def root(request: Request):
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            ROOT_HTML_GZIP,
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return Response(ROOT_HTML_BYTES, media_type="text/html")
 
 @app.get("/health")
 async def health():
     return {"status": "Realtime AI Backend is Running!", "version": "1.0.0"}
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets")
@@ -1,6 +1,7 @@
 ﻿import logging
-import uuid
+import secrets
 import asyncio
+import orjson
 import os
 import sys
 from pathlib import Path
@@ -16,7 +17,7 @@ sys.path.insert(0, str(project_root))
 
 from app.core.config import settings
 from app.core.websocket import manager
-from app.core.llm import llm_service
+from app.core.llm import llm_service, aclose_http_client
 from app.db.supabase import supabase_service
 from app.services.session_service import session_service
 from app.services.summary_service import summary_service
@@ -28,6 +29,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Streamed tokens are coalesced into WebSocket frames of up to this many
+# characters, flushed at least this often
+CHUNK_FLUSH_CHARS = 256
+CHUNK_FLUSH_SECONDS = 0.025
+
+# Fixed control frames, serialized once at import
+AI_RESPONSE_START = orjson.dumps({"type": "ai_response_start"})
+AI_RESPONSE_END = orjson.dumps({"type": "ai_response_end"})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -60,6 +70,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Realtime AI Backend")
     logger.info(f"Active sessions: {session_service.get_session_count()}")
+    await supabase_service.aclose()
+    await aclose_http_client()
 
 
 app = FastAPI(
@@ -106,9 +118,10 @@ async def health():
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time chat with streaming responses"""
     
-    # Generate session ID if not provided
+    # Generate session ID if not provided - token_urlsafe is cheaper
+    # than a uuid4 (no hex/dash formatting) and URL-safe by construction
     if not session_id or session_id == "new":
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_urlsafe(12)
     
     # Connect and create session
     await manager.connect(websocket, session_id)
@@ -128,7 +141,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             await manager.handle_message(session_id, message, handle_user_message)
     
     except WebSocketDisconnect:
-        logger.info(f"✗ WebSocket disconnected: {session_id}")
+        logger.info("✗ WebSocket disconnected: %s", session_id)
         await manager.disconnect(session_id)
         
         # Generate summary as background task (non-blocking)
@@ -136,7 +149,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         await summary_service.generate_summary_async(session_id, conversation)
     
     except Exception as e:
-        logger.error(f"✗ WebSocket error: {e}")
+        logger.error("✗ WebSocket error: %s", e)
         await manager.disconnect(session_id)
 
 
@@ -145,37 +158,48 @@ async def handle_user_message(session_id: str, user_message: str):
     try:
         # Add user message to conversation
         await session_service.add_message(session_id, "user", user_message)
-        logger.info(f"→ User message ({session_id}): {user_message[:50]}...")
+        logger.info("→ User message (%s): %.50s...", session_id, user_message)
         
         # Get current conversation
         conversation = session_service.get_conversation(session_id)
         
         # Stream LLM response
         full_response = ""
-        await manager.send_json(session_id, {
-            "type": "ai_response_start"
-        })
-        
+        await manager.send_bytes(session_id, AI_RESPONSE_START)
+
+        # Coalesce tokens into frames of up to CHUNK_FLUSH_CHARS chars or
+        # CHUNK_FLUSH_SECONDS, whichever fills first - one frame then
+        # carries many deltas instead of paying per-token frame overhead
+        buffer = ""
+        now = asyncio.get_running_loop().time
+        last_flush = now()
         async for token in llm_service.stream_response(conversation):
             full_response += token
+            buffer += token
+            if len(buffer) >= CHUNK_FLUSH_CHARS or now() - last_flush >= CHUNK_FLUSH_SECONDS:
+                await manager.send_json(session_id, {
+                    "type": "ai_response_chunk",
+                    "content": buffer
+                })
+                buffer = ""
+                last_flush = now()
+
+        # Flush whatever is left before the completion marker
+        if buffer:
             await manager.send_json(session_id, {
                 "type": "ai_response_chunk",
-                "content": token
+                "content": buffer
             })
-            # Yield to event loop for better responsiveness
-            await asyncio.sleep(0)
-        
+
         # Send completion marker
-        await manager.send_json(session_id, {
-            "type": "ai_response_end"
-        })
+        await manager.send_bytes(session_id, AI_RESPONSE_END)
         
         # Save AI response to conversation and database
         await session_service.add_message(session_id, "assistant", full_response)
-        logger.info(f"← AI response ({session_id}): {full_response[:50]}...")
+        logger.info("← AI response (%s): %.50s...", session_id, full_response)
     
     except Exception as e:
-        logger.error(f"✗ Error handling user message: {e}")
+        logger.error("✗ Error handling user message: %s", e)
         await manager.send_json(session_id, {
             "type": "error",
             "content": f"Error: {str(e)}"
@@ -186,8 +210,11 @@ async def handle_user_message(session_id: str, user_message: str):
 async def get_session(session_id: str):
     """Get session details and conversation history"""
     try:
-        session = await supabase_service.get_session(session_id)
-        history = await supabase_service.get_session_history(session_id)
+        # The two database reads are independent - run them concurrently
+        session, history = await asyncio.gather(
+            supabase_service.get_session(session_id),
+            supabase_service.get_session_history(session_id)
+        )
         conversation = session_service.get_conversation(session_id)
         
         return {
@@ -197,7 +224,7 @@ async def get_session(session_id: str):
             "message_count": len(conversation)
         }
     except Exception as e:
-        logger.error(f"Error retrieving session: {e}")
+        logger.error("Error retrieving session: %s", e)
         return {"error": str(e)}, 500
 
 
@@ -216,9 +243,21 @@ if __name__ == "__main__":
     print(" Health: http://localhost:8001/health")
     print("=" * 70 + "\n")
     
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+
+    # Dev keeps the reloader; production runs one worker per core since
+    # streaming is CPU-bound on JSON/pydantic work. Sessions live in
+    # process memory, so multi-worker deployments need sticky sessions
+    # at the load balancer (or an external session store).
+    workers = None if settings.DEBUG else (os.cpu_count() or 1)
     uvicorn.run(
         "main:app",
         host=settings.SERVER_HOST,
         port=settings.SERVER_PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        workers=workers,
+        loop=loop,
+        http="httptools",
+        ws="websockets"
     )
@@ -1,13 +1,17 @@
 ﻿import os
+import sys
 import logging
-import uuid
-import json
+import secrets
 import asyncio
+import gzip
+import orjson
+from collections import deque
+import aiohttp
 from contextlib import asynccontextmanager
-from typing import Dict, List
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
-from openai import AsyncOpenAI
+from typing import Dict, List, Optional
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -18,45 +22,137 @@ load_dotenv("C:\\workspace\\realtime_ai_backend\\.env")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+OPENAI_API_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
+
+# Streaming goes straight to the completions endpoint over aiohttp - it
+# sustains far more concurrent streams than the SDK's httpx stack, and
+# parsing the SSE lines with orjson skips pydantic entirely
+_aio_session: Optional[aiohttp.ClientSession] = None
+
+
+def _get_aio_session() -> aiohttp.ClientSession:
+    global _aio_session
+    if _aio_session is None or _aio_session.closed:
+        _aio_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=256, limit_per_host=256, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=120, sock_connect=5),
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+    return _aio_session
+
+# Chunk frames queued past this point coalesce into the newest one
+MAX_QUEUED_FRAMES = 64
 
-openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 class WebSocketManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.queues: Dict[str, deque] = {}
+        self.wakeups: Dict[str, asyncio.Event] = {}
+        self.sender_tasks: Dict[str, asyncio.Task] = {}
 
     async def connect(self, websocket: WebSocket, session_id: str):
         await websocket.accept()
         self.active_connections[session_id] = websocket
-        logger.info(f"Client connected: {session_id}")
+        # Frames go through a per-session buffer drained by a dedicated
+        # sender task, so a slow client never stalls the stream producer.
+        # An owned deque + wakeup event instead of asyncio.Queue: the
+        # producer can coalesce the tail in place without blocking or
+        # reaching into Queue internals.
+        self.queues[session_id] = deque()
+        self.wakeups[session_id] = asyncio.Event()
+        self.sender_tasks[session_id] = asyncio.create_task(self._drain(session_id))
+        logger.info("Client connected: %s", session_id)
 
     async def disconnect(self, session_id: str):
-        if session_id in self.active_connections:
-            del self.active_connections[session_id]
+        self.active_connections.pop(session_id, None)
+        self.queues.pop(session_id, None)
+        self.wakeups.pop(session_id, None)
+        task = self.sender_tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _drain(self, session_id: str):
+        websocket = self.active_connections[session_id]
+        queue = self.queues[session_id]
+        wakeup = self.wakeups[session_id]
+        try:
+            while True:
+                while not queue:
+                    wakeup.clear()
+                    await wakeup.wait()
+                await websocket.send_bytes(queue.popleft())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error sending: %s", e)
+            await self.disconnect(session_id)
 
     async def send_json(self, session_id: str, data: dict):
-        if session_id in self.active_connections:
-            try:
-                await self.active_connections[session_id].send_json(data)
-            except Exception as e:
-                logger.error(f"Error sending: {e}")
+        self._enqueue(session_id, orjson.dumps(data))
+
+    async def send_bytes(self, session_id: str, payload: bytes):
+        self._enqueue(session_id, payload)
+
+    def _enqueue(self, session_id: str, payload: bytes):
+        queue = self.queues.get(session_id)
+        if queue is None:
+            return
+        # Backpressure: past the cap, merge chunk frames into the newest
+        # queued one (drop-latest coalescing) so the producer never
+        # blocks. Control frames are rare and always appended.
+        if (
+            len(queue) >= MAX_QUEUED_FRAMES
+            and queue
+            and payload[:1] == FRAME_CHUNK
+            and queue[-1][:1] == FRAME_CHUNK
+        ):
+            queue[-1] = queue[-1] + payload[1:]
+        else:
+            queue.append(payload)
+        self.wakeups[session_id].set()
+
+# Bounded store: idle sessions expire after an hour and the oldest are
+# evicted past MAX_SESSIONS, so memory can't grow without limit
+sessions: TTLCache = TTLCache(maxsize=int(os.getenv("MAX_SESSIONS", "10000")), ttl=3600)
 
-sessions: Dict[str, List[dict]] = {}
+# Stored at index 0 of every session so each turn reuses the identical
+# message list instead of re-concatenating a new one
+SYSTEM_MSG = {"role": "system", "content": "You are a helpful AI assistant."}
+
+# Binary framing: 1 tag byte + raw UTF-8 payload for chunks. JSON is
+# kept only for the rare control messages (errors, system notices).
+FRAME_START = b"\x01"
+FRAME_CHUNK = b"\x02"
+FRAME_END = b"\x03"
 
 async def stream_response(conversation: List[dict]):
+    payload = orjson.dumps({
+        "model": LLM_MODEL,
+        "messages": conversation,
+        "temperature": LLM_TEMPERATURE,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "max_tokens": 2000
+    })
     try:
-        response = await openai_client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[{"role": "system", "content": "You are a helpful AI assistant."}] + conversation,
-            temperature=LLM_TEMPERATURE,
-            stream=True,
-            max_tokens=2000
-        )
-        async for chunk in response:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        async with _get_aio_session().post(OPENAI_API_URL, data=payload) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:].strip()
+                if data == b"[DONE]":
+                    break
+                choices = orjson.loads(data)["choices"]
+                token = choices[0]["delta"].get("content") if choices else None
+                if token:
+                    yield token
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         yield f"Error: {str(e)}"
 
 manager = WebSocketManager()
@@ -65,6 +161,8 @@ manager = WebSocketManager()
 async def lifespan(app: FastAPI):
     logger.info("Backend starting")
     yield
+    if _aio_session is not None and not _aio_session.closed:
+        await _aio_session.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -108,6 +206,7 @@ const chatBox = document.getElementById("chatBox");
 const messageInput = document.getElementById("messageInput");
 const sendBtn = document.getElementById("sendBtn");
 let isWaiting = false;
+const decoder = new TextDecoder();
 
 function connectWebSocket() {
     const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
@@ -115,18 +214,27 @@ function connectWebSocket() {
     const url = protocol + "//" + host + "/ws/session/new";
     console.log("Connecting to:", url);
     ws = new WebSocket(url);
+    ws.binaryType = "arraybuffer";
     
     ws.onopen = () => console.log("Connected");
     ws.onmessage = (e) => {
-        const msg = JSON.parse(e.data);
-        if (msg.type === "ai_response_start") addLoading();
-        else if (msg.type === "ai_response_chunk") appendAI(msg.content);
-        else if (msg.type === "ai_response_end") { isWaiting = false; sendBtn.disabled = false; }
+        if (e.data instanceof ArrayBuffer) {
+            const b = new Uint8Array(e.data);
+            if (b[0] === 1) addLoading();
+            else if (b[0] === 2) appendAI(decoder.decode(b.subarray(1)));
+            else if (b[0] === 3) { isWaiting = false; sendBtn.disabled = false; }
+        } else handleMsg(JSON.parse(e.data));
     };
     ws.onerror = (e) => console.error("Error:", e);
     ws.onclose = () => setTimeout(connectWebSocket, 3000);
 }
 
+function handleMsg(msg) {
+    if (msg.type === "ai_response_start") addLoading();
+    else if (msg.type === "ai_response_chunk") appendAI(msg.content);
+    else if (msg.type === "ai_response_end") { isWaiting = false; sendBtn.disabled = false; }
+}
+
 function sendMessage() {
     const text = messageInput.value.trim();
     if (!text || isWaiting || !ws || ws.readyState !== 1) return;
@@ -180,48 +288,76 @@ connectWebSocket();
 </body>
 </html>"""
 
+# The chat page is fixed at import time - encode and gzip it once so
+# GET / never re-encodes the ~4 KB literal per request
+CHAT_HTML_BYTES = CHAT_HTML.encode("utf-8")
+CHAT_HTML_GZIP = gzip.compress(CHAT_HTML_BYTES, compresslevel=9)
+
 @app.get("/")
-def root():
-    return HTMLResponse(CHAT_HTML)
+def root(request: Request):
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            CHAT_HTML_GZIP,
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return Response(CHAT_HTML_BYTES, media_type="text/html")
 
 @app.websocket("/ws/session/{sid}")
 async def ws_endpoint(websocket: WebSocket, sid: str):
     if sid == "new":
-        sid = str(uuid.uuid4())
+        # Cheaper than uuid4 and URL-safe by construction
+        sid = secrets.token_urlsafe(12)
     
     await manager.connect(websocket, sid)
     if sid not in sessions:
-        sessions[sid] = []
+        sessions[sid] = [SYSTEM_MSG]
     
     try:
         while True:
             data = await websocket.receive_text()
-            msg = json.loads(data)
+            msg = orjson.loads(data)
             text = msg.get("content", "")
             if not text:
                 continue
             
-            logger.info(f"Message: {text[:50]}")
+            logger.info("Message: %.50s", text)
             sessions[sid].append({"role": "user", "content": text})
             
-            await manager.send_json(sid, {"type": "ai_response_start"})
+            await manager.send_bytes(sid, FRAME_START)
+            # Coalesce tokens into 256-char / 25ms frames instead of one frame per delta
             full = ""
+            buf = ""
+            now = asyncio.get_running_loop().time
+            last_flush = now()
             async for token in stream_response(sessions[sid]):
                 full += token
-                await manager.send_json(sid, {"type": "ai_response_chunk", "content": token})
-                await asyncio.sleep(0)
-            
+                buf += token
+                if len(buf) >= 256 or now() - last_flush >= 0.025:
+                    await manager.send_bytes(sid, FRAME_CHUNK + buf.encode())
+                    buf = ""
+                    last_flush = now()
+
+            if buf:
+                await manager.send_bytes(sid, FRAME_CHUNK + buf.encode())
             if full:
                 sessions[sid].append({"role": "assistant", "content": full})
-            await manager.send_json(sid, {"type": "ai_response_end"})
+                # Keep the history short: system prompt + the last 30 messages
+                if len(sessions[sid]) > 40:
+                    del sessions[sid][1:len(sessions[sid]) - 30]
+            await manager.send_bytes(sid, FRAME_END)
             
     except WebSocketDisconnect:
         await manager.disconnect(sid)
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         await manager.disconnect(sid)
+    finally:
+        sessions.pop(sid, None)
 
 if __name__ == "__main__":
     import uvicorn
     print("\nServer: http://localhost:8000\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets")
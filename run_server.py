@@ -1,35 +1,128 @@
 ﻿import os
 import sys
-os.chdir("C:\\workspace\\realtime_ai_backend")
-sys.path.insert(0, "C:\\workspace\\realtime_ai_backend")
 
+# The working directory and import path come from the deployment
+# (Dockerfile WORKDIR, systemd unit, or running `uvicorn run_server:app
+# --workers N` from the project root) rather than being forced here.
+
+import asyncio
 import logging
+import orjson
+import time
 import uuid
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
+from starlette.datastructures import MutableHeaders
 from app.core.config import settings
 from app.core.websocket import manager
 from app.core.llm import llm_service
-from app.db.supabase import supabase_service
+from app.db.supabase import supabase_service, now_iso
 from app.services.session_service import session_service
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Fixed control frames, serialized once at import
+AI_RESPONSE_START = orjson.dumps({"type": "ai_response_start", "content": ""})
+AI_RESPONSE_END = orjson.dumps({"type": "ai_response_end", "content": ""})
+
+# Event logging is non-critical persistence - it goes through a bounded
+# queue drained by a background worker so the message path never waits
+# on a Supabase round-trip
+_log_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+# Batch tuning for the log worker: flush once this many events are
+# collected, or when the queue stays quiet for this long
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_SECONDS = 0.5
+
+
+async def _log_worker():
+    # Insert events in batches - one POST per batch instead of one HTTP
+    # round-trip per event
+    while True:
+        batch = [await _log_queue.get()]
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(await asyncio.wait_for(_log_queue.get(), timeout=LOG_FLUSH_SECONDS))
+            except asyncio.TimeoutError:
+                break
+        try:
+            await supabase_service.log_events_bulk(batch)
+        except Exception as e:
+            logger.error(f"Error flushing event batch: {e}")
+
+
+def _queue_event(session_id: str, event_type: str, content: str):
+    try:
+        _log_queue.put_nowait({
+            "session_id": session_id,
+            "event_type": event_type,
+            "content": content,
+            "created_at": now_iso()
+        })
+    except asyncio.QueueFull:
+        logger.warning("Event log queue full - dropping event")
+
+class TimingMiddleware:
+    """Pure-ASGI request timing middleware.
+
+    Deliberately not a BaseHTTPMiddleware subclass - that wrapper spawns
+    an extra task and buffers bodies per request. Any future middleware
+    (auth, logging) should follow this same scope/receive/send shape.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = f"{time.perf_counter() - start:.4f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Realtime AI Backend")
-    health = await supabase_service.health_check()
+
+    # Prewarm outbound connections so the first user message doesn't pay
+    # DNS + TCP + TLS setup to OpenAI on top of its own latency
+    async def prewarm_llm():
+        try:
+            await llm_service.client.models.list()
+            logger.info(" LLM connection prewarmed")
+        except Exception as e:
+            logger.warning(f" LLM prewarm failed: {e}")
+
+    # The health check doubles as the Supabase prewarm - one round-trip,
+    # run alongside the LLM prewarm
+    health, _ = await asyncio.gather(supabase_service.health_check(), prewarm_llm())
     if health:
         logger.info(" Supabase connection healthy")
     else:
         logger.warning(" Supabase connection failed - check credentials")
+    log_task = asyncio.create_task(_log_worker())
     yield
+    log_task.cancel()
     logger.info("Shutting down Realtime AI Backend")
 
-app = FastAPI(title="Realtime AI Backend", description="WebSocket-based AI backend", version="1.0.0", lifespan=lifespan)
+app = FastAPI(title="Realtime AI Backend", description="WebSocket-based AI backend", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+# Session history JSON compresses 5-25x; tiny responses skip the
+# compressor via the size threshold
+app.add_middleware(GZipMiddleware, minimum_size=512)
+app.add_middleware(TimingMiddleware)
 
 try:
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -59,41 +152,70 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             message = await websocket.receive_text()
             await manager.handle_message(session_id, message, handle_user_message)
     except WebSocketDisconnect:
-        await manager.disconnect(session_id)
         logger.info(f"WebSocket connection closed: {session_id}")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
+        # Runs on every exit path, including cancellation
         await manager.disconnect(session_id)
 
+MAX_MESSAGE_CHARS = 8192
+
 async def handle_user_message(session_id: str, user_message: str):
+    # Empty or oversized messages never reach the LLM - the former are
+    # client bugs, the latter cap per-message token cost
+    user_message = user_message.strip()
+    if not user_message:
+        return
+    if len(user_message) > MAX_MESSAGE_CHARS:
+        await manager.send_json(session_id, {"type": "error", "content": f"Message too long (max {MAX_MESSAGE_CHARS} characters)"})
+        return
     try:
         await session_service.add_message(session_id, "user", user_message)
         conversation = session_service.get_conversation(session_id)
-        full_response = ""
-        await manager.send_json(session_id, {"type": "ai_response_start", "content": ""})
+        await manager.send_bytes(session_id, AI_RESPONSE_START)
+        # Coalesce tokens into frames of up to 64 chars / 30ms - one frame
+        # then carries many deltas instead of paying per-token overhead.
+        # Tokens accumulate in lists joined once, avoiding the quadratic
+        # copying of repeated string concatenation on long responses.
+        parts = []
+        buf = []
+        buf_len = 0
+        now = asyncio.get_running_loop().time
+        last_flush = now()
         async for token in llm_service.stream_response(conversation):
-            full_response += token
-            await manager.send_json(session_id, {"type": "ai_response_chunk", "content": token})
-            if len(full_response) % 5 == 0:
-                import asyncio
-                await asyncio.sleep(0)
-        await manager.send_json(session_id, {"type": "ai_response_end", "content": ""})
+            parts.append(token)
+            buf.append(token)
+            buf_len += len(token)
+            if buf_len >= 64 or now() - last_flush >= 0.03:
+                await manager.send_json(session_id, {"type": "ai_response_chunk", "content": "".join(buf)})
+                buf.clear()
+                buf_len = 0
+                last_flush = now()
+        if buf:
+            await manager.send_json(session_id, {"type": "ai_response_chunk", "content": "".join(buf)})
+        # End marker goes out before persistence so the UI isn't waiting
+        # on database round-trips; the two writes are independent
+        await manager.send_bytes(session_id, AI_RESPONSE_END)
+        full_response = "".join(parts)
+        _queue_event(session_id, "ai_response", full_response)
         await session_service.add_message(session_id, "assistant", full_response)
-        await supabase_service.log_event(session_id=session_id, event_type="ai_response", content=full_response)
         logger.info(f"Response streamed for {session_id}")
     except Exception as e:
         logger.error(f"Error handling user message: {e}")
         await manager.send_json(session_id, {"type": "error", "content": f"Error processing message: {str(e)}"})
 
-@app.get("/api/session/{session_id}")
+@app.get("/api/session/{session_id}", response_model=None)
 async def get_session(session_id: str):
     try:
         session = await supabase_service.get_session(session_id)
         history = await supabase_service.get_session_history(session_id)
-        return {"session": session, "history": history, "conversation": session_service.get_conversation(session_id)}
+        # Returned directly so FastAPI skips jsonable_encoder - on long
+        # histories that walk is the dominant cost of this endpoint
+        return ORJSONResponse({"session": session, "history": history, "conversation": session_service.get_conversation(session_id)})
     except Exception as e:
         logger.error(f"Error retrieving session: {e}")
-        return {"error": str(e)}, 500
+        return ORJSONResponse({"error": str(e)}, status_code=500)
 
 if __name__ == "__main__":
     import uvicorn
@@ -110,4 +232,13 @@ if __name__ == "__main__":
     print(" Chat UI: http://localhost:8000/")
     print(" Health: http://localhost:8000/health")
     print("="*70 + "\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=False)
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    # One worker per core by default (override with WEB_CONCURRENCY).
+    # Equivalent production invocation:
+    #   gunicorn run_server:app -k uvicorn.workers.UvicornWorker \
+    #       -w $(nproc) -b 0.0.0.0:8000 --worker-connections 1000
+    # Session state is process-local, so multi-worker deployments need
+    # sticky sessions at the load balancer.
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run("run_server:app", host="0.0.0.0", port=8000, reload=False, workers=workers, loop=loop, http="httptools", ws="websockets")
@@ -1,11 +1,17 @@
 import os
+import sys
 import logging
 import uuid
-import json
+import time
+import orjson
 import asyncio
+import httpx
 from typing import Dict, List
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from websockets.exceptions import ConnectionClosed
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from starlette.datastructures import MutableHeaders
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
@@ -17,31 +23,141 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
 
-openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Default httpx pools cap at 10 connections, queueing concurrent LLM
+# streams behind each other; HTTP/2 multiplexes them over one connection
+openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+)
+
+# Conversation history lives in Redis when REDIS_URL is set, so workers
+# can scale out and a restart doesn't lose sessions; without it the
+# in-process dict keeps single-worker dev working (same fallback shape
+# as the Supabase service). Keys expire after an hour of inactivity.
+REDIS_URL = os.getenv("REDIS_URL", "")
+SESSION_TTL = 3600
+
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    redis_client = aioredis.Redis(
+        connection_pool=aioredis.ConnectionPool.from_url(REDIS_URL, max_connections=50)
+    )
+else:
+    redis_client = None
+
 sessions: Dict[str, List[dict]] = {}
 
+# Fixed control frames, serialized once at import
+START_FRAME = orjson.dumps({"type": "start"})
+END_FRAME = orjson.dumps({"type": "end"})
+
+# Seeded at index 0 of every session so each turn passes the same list
+# to the API without re-concatenating the prefix (and keeps it stable
+# for server-side prompt caching)
+SYSTEM_MSG = {"role": "system", "content": "You are helpful."}
+
+
+async def append_message(sid: str, msg: dict):
+    if redis_client is not None:
+        key = f"sess:{sid}"
+        await redis_client.rpush(key, orjson.dumps(msg))
+        await redis_client.expire(key, SESSION_TTL)
+    else:
+        sessions.setdefault(sid, []).append(msg)
+
+
+async def get_history(sid: str) -> List[dict]:
+    if redis_client is not None:
+        raw = await redis_client.lrange(f"sess:{sid}", 0, -1)
+        return [orjson.loads(m) for m in raw]
+    return sessions.get(sid, [])
+
+# Shard count for the connection registry (power of two for cheap masking)
+_SHARDS = 16
+
+
 class Manager:
+    """Connection registry sharded by session id.
+
+    One dict is fine under the GIL, but sharding removes the shared
+    contention point on free-threading builds and caps rehash cost
+    during disconnect storms.
+    """
+
     def __init__(self):
-        self.active = {}
-    
+        self.shards = [{} for _ in range(_SHARDS)]
+
+    def _shard(self, sid: str) -> dict:
+        return self.shards[hash(sid) & (_SHARDS - 1)]
+
     async def connect(self, ws: WebSocket, sid: str):
         await ws.accept()
-        self.active[sid] = ws
+        self._shard(sid)[sid] = ws
         logger.info(f"Connected: {sid}")
     
     async def disconnect(self, sid: str):
-        if sid in self.active:
-            del self.active[sid]
+        self._shard(sid).pop(sid, None)
     
     async def send_json(self, sid: str, data: dict):
-        if sid in self.active:
+        # orjson + send_bytes skips Starlette's stdlib json.dumps
+        await self.send_bytes(sid, orjson.dumps(data))
+
+    async def send_bytes(self, sid: str, data: bytes):
+        ws = self._shard(sid).get(sid)
+        if ws is not None:
             try:
-                await self.active[sid].send_json(data)
-            except:
-                pass
+                await ws.send_bytes(data)
+            except (WebSocketDisconnect, ConnectionClosed, RuntimeError) as e:
+                # Catch only send failures - a bare except here would also
+                # swallow CancelledError and leave zombie handlers behind
+                logger.debug("ws send failed for %s: %s", sid, e)
+                await self.disconnect(sid)
+
+    async def broadcast(self, data: dict):
+        """Send a message to every connected session (serialized once)"""
+        payload = orjson.dumps(data)
+        for shard in self.shards:
+            for sid in list(shard):
+                await self.send_bytes(sid, payload)
 
 manager = Manager()
-app = FastAPI()
+
+
+class TimingMiddleware:
+    """Pure-ASGI request timing middleware.
+
+    Deliberately not a BaseHTTPMiddleware subclass - that wrapper spawns
+    an extra task and buffers bodies per request. Any future middleware
+    (auth, logging) should follow this same scope/receive/send shape.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = f"{time.perf_counter() - start:.4f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+# Compress anything over the threshold (the HTML page shrinks ~4x);
+# responses below it skip the compressor entirely
+app.add_middleware(GZipMiddleware, minimum_size=512)
+app.add_middleware(TimingMiddleware)
 
 HTML = """<!DOCTYPE html>
 <html lang="en">
@@ -156,18 +272,22 @@ HTML = """<!DOCTYPE html>
             
             ws.onopen = () => console.log('Connected');
             ws.onmessage = (e) => {
-                const data = JSON.parse(e.data);
-                if (data.type === 'start') addLoading();
-                else if (data.type === 'chunk') appendAI(data.text);
-                else if (data.type === 'end') {
-                    waiting = false;
-                    send.disabled = false;
-                }
+                if (e.data instanceof Blob) e.data.text().then((t) => handleMsg(JSON.parse(t)));
+                else handleMsg(JSON.parse(e.data));
             };
             ws.onerror = (e) => console.error('Error', e);
             ws.onclose = () => setTimeout(connect, 3000);
         }
 
+        function handleMsg(data) {
+            if (data.type === 'start') addLoading();
+            else if (data.type === 'chunk') appendAI(data.text);
+            else if (data.type === 'end') {
+                waiting = false;
+                send.disabled = false;
+            }
+        }
+
         function sendMsg() {
             const text = msg.value.trim();
             if (!text || waiting) return;
@@ -226,7 +346,7 @@ async def stream(conv):
     try:
         resp = await openai_client.chat.completions.create(
             model=LLM_MODEL,
-            messages=[{"role": "system", "content": "You are helpful."}] + conv,
+            messages=conv,
             temperature=LLM_TEMPERATURE,
             stream=True,
             max_tokens=2000
@@ -238,44 +358,73 @@ async def stream(conv):
         logger.error(str(e))
         yield f"Error: {str(e)}"
 
+# Built once at import - GET / re-encoded the multi-KB page per request
+_HTML_RESPONSE = Response(
+    content=HTML.encode("utf-8"),
+    media_type="text/html",
+    headers={"cache-control": "public, max-age=3600"}
+)
+
 @app.get("/")
 def home():
-    return HTMLResponse(HTML)
+    return _HTML_RESPONSE
 
 @app.websocket("/ws/new")
 async def ws(websocket: WebSocket):
     sid = str(uuid.uuid4())
     await manager.connect(websocket, sid)
-    sessions[sid] = []
+    if redis_client is None:
+        sessions[sid] = [SYSTEM_MSG]
+    else:
+        await append_message(sid, SYSTEM_MSG)
     
     try:
         while True:
             data = await websocket.receive_text()
-            msg_data = json.loads(data)
+            msg_data = orjson.loads(data)
             text = msg_data.get("content", "")
             
             if not text:
                 continue
             
-            sessions[sid].append({"role": "user", "content": text})
-            await manager.send_json(sid, {"type": "start"})
+            await append_message(sid, {"role": "user", "content": text})
+            await manager.send_bytes(sid, START_FRAME)
             
-            full = ""
-            async for token in stream(sessions[sid]):
-                full += token
-                await manager.send_json(sid, {"type": "chunk", "text": token})
-                await asyncio.sleep(0)
+            # Coalesce tokens into frames of up to 64 chars / 30ms instead
+            # of one WebSocket frame + JSON encode per token. Tokens are
+            # collected in lists and joined once - O(N) instead of the
+            # quadratic copying of += on a growing string.
+            parts = []
+            buf = []
+            buf_len = 0
+            now = asyncio.get_running_loop().time
+            last_flush = now()
+            async for token in stream(await get_history(sid)):
+                parts.append(token)
+                buf.append(token)
+                buf_len += len(token)
+                if buf_len >= 64 or now() - last_flush >= 0.03:
+                    await manager.send_json(sid, {"type": "chunk", "text": "".join(buf)})
+                    buf.clear()
+                    buf_len = 0
+                    last_flush = now()
             
+            if buf:
+                await manager.send_json(sid, {"type": "chunk", "text": "".join(buf)})
+            full = "".join(parts)
             if full and not full.startswith("Error"):
-                sessions[sid].append({"role": "assistant", "content": full})
+                await append_message(sid, {"role": "assistant", "content": full})
             
-            await manager.send_json(sid, {"type": "end"})
+            await manager.send_bytes(sid, END_FRAME)
             
     except WebSocketDisconnect:
-        await manager.disconnect(sid)
+        pass
     except Exception as e:
         logger.error(str(e))
+    finally:
+        # Runs on every exit path, including cancellation
         await manager.disconnect(sid)
+        sessions.pop(sid, None)
 
 if __name__ == "__main__":
     import uvicorn
@@ -284,4 +433,13 @@ if __name__ == "__main__":
     print("="*60)
     print("Server: http://localhost:8000")
     print("="*60 + "\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is POSIX-only; fall back to the default loop on Windows
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    # One worker per core by default (override with WEB_CONCURRENCY).
+    # Equivalent production invocation:
+    #   gunicorn server:app -k uvicorn.workers.UvicornWorker \
+    #       -w $(nproc) -b 0.0.0.0:8000 --worker-connections 1000
+    # Sessions are process-local, so multi-worker deployments need
+    # sticky sessions at the load balancer.
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run("server:app", host="0.0.0.0", port=8000, workers=workers, loop=loop, http="httptools", ws="websockets")